@@ -1,4 +1,5 @@
 from sproc import Sub
+import functools
 import inspect
 import sproc
 
@@ -7,6 +8,9 @@ _, *ALL = sproc.__all__
 
 assert _ == 'Sub'
 
+BACKTICKS = {ord('`'): '``'}
+signature = functools.lru_cache(maxsize=None)(inspect.signature)
+
 
 def main():
     with open(README_FILE, 'w') as fp:
@@ -17,8 +21,11 @@ def make_doc():
     def header(s, c='-'):
         return '%s\n%s' % (s, c * (len(s) + s.count('`')))
 
+    methods = {name: getattr(Sub, name) for name in ['__iter__', *ALL]}
+    functions = {name: getattr(sproc, name) for name in ALL}
+
     def sig(name, thing):
-        return '`%s%s`' % (name, str(inspect.signature(thing)))
+        return '`%s%s`' % (name, str(signature(thing)))
 
     def indent(s, indent='    '):
         for i in s.splitlines():
@@ -35,8 +42,7 @@ def make_doc():
         yield header('`Sub.__init__(self, cmd, **kwds)`')
         yield from indent(Sub.__doc__)
 
-        for name in ['__iter__'] + ALL:
-            method = getattr(Sub, name)
+        for name, method in methods.items():
             yield header(sig('Sub.' + name, method))
             yield from indent(method.__doc__)
 
@@ -45,13 +51,12 @@ def make_doc():
         yield ''
         yield header('Functions', '=')
 
-        for name in ALL:
-            function = getattr(sproc, name)
+        for name, function in functions.items():
             yield ''
             yield header(sig('sproc.' + name, function))
             yield from indent(function.__doc__)
 
-    return '\n'.join(apis()).strip().replace('`', '``')
+    return '\n'.join(apis()).strip().translate(BACKTICKS)
 
 
 if __name__ == '__main__':
@@ -30,39 +30,103 @@ Useful for handling long-running proceesses that write to both `stdout` and
 
     # Log stdout and stderr, with prefixes
     returncode = sproc.log(CMD)
+
+    # Iterate from a coroutine, without using threads
+    async for ok, line in sproc.Sub(CMD):
+        print(ok, line)
+
+    # Run several commands at the same time, and get a list of run() results
+    results = sproc.gather([CMD, OTHER_CMD])
 """
 
+import asyncio
+import builtins
+import codecs
 import functools
+import os
+import selectors
 import shlex
 import subprocess
+import sys
 import typing as t
-from queue import Queue
-from threading import Thread
-from typing import Callable, List, Mapping, Optional, Sequence, Union
+from asyncio.subprocess import Process
+from collections import deque
+from queue import SimpleQueue
+from threading import Event, Lock, Thread
+from typing import Callable, Deque, List, Mapping, Optional, Sequence, Union
 
-__all__ = 'Sub', 'call', 'call_in_thread', 'run', 'log'
+__all__ = 'Sub', 'call', 'call_batch', 'call_in_thread', 'run', 'log', 'gather'
 
 DEFAULTS = {'stderr': subprocess.PIPE, 'stdout': subprocess.PIPE}
+# Before 3.13, CPython only uses posix_spawn() without any of these
+SPAWN_BLOCKERS = {
+    'cwd',
+    'extra_groups',
+    'group',
+    'pass_fds',
+    'preexec_fn',
+    'process_group',
+    'start_new_session',
+    'umask',
+    'user',
+}
+SPAWN_NEEDS_OPEN_FDS = os.name != 'nt' and sys.version_info < (3, 13)
+CHUNK_SIZE = 0x10000
+PIPE_SIZE = 0x100000
 
 Callback = Optional[t.Callable[..., t.Any]]
 Cmd = Union[str, Sequence[str]]
+Lines = t.List[str]
+Batches = t.Iterator[t.Tuple[bool, Lines]]
+Receiver = t.Callable[[bool, Lines], None]
+Read = t.Union[Lines, Exception, None]
 
 
 class Sub:
     """
     Sub is a class to Iterate over lines or chunks of text from a subprocess.
 
-    If `by_lines` is true, use readline() to get each new item;
-    if false, use read1().
+    If `by_lines` is true, split the output into lines of text;
+    if false, yield each chunk as it comes.
+
+    A `Sub` can be run more than once.  The command and the arguments to
+    `Popen` are prepared once, in the constructor, so keep a `Sub` to run the
+    same command repeatedly.
 
     Args:
       cmd:  The command to run in a subprocess
 
-      by_lines:  If `by_lines` is true, `Sub` uses readline() to get each new
-          item;  otherwise, it uses read1() to get each chunk as it comes.
+      by_lines:  If `by_lines` is true, `Sub` reads large chunks with os.read()
+          and splits them into lines;  otherwise, it yields each chunk as it
+          comes.
+
+      encoding:  The encoding used to decode the output into `str`.
+          If `encoding` is None, the output is not decoded, and `Sub` yields
+          `bytes` instead.
+
+      errors:  How decoding errors are handled, as in `bytes.decode()`:
+          'strict' raises `UnicodeDecodeError`, 'replace' puts in U+FFFD.
+
+      merge:  If `merge` is true, `stderr` is sent to `stdout` and only one
+          pipe is read: all lines are yielded with `ok` set to True.
 
       kwargs: The arguments to subprocess.Popen.
 
+          Before Python 3.13 on POSIX, if CPython could spawn the child
+          process with the faster `posix_spawn()`, `close_fds` defaults to
+          False, which it needs to do so.  That is when `shell` is true or
+          the program has a directory part, like `/bin/ls`, and none of
+          `cwd`, `pass_fds`, `preexec_fn`, `start_new_session`,
+          `process_group`, `user`, `group`, `extra_groups` or `umask` is set.
+          Set `close_fds=True` if the child must not inherit file descriptors
+          that were made inheritable.  From 3.13, CPython uses `posix_spawn()`
+          with `close_fds=True` too, so the default is left alone.
+
+          `text=True` is accepted and changes nothing, because `Sub` already
+          decodes the output with `encoding`.  `text=False` raises
+          `ValueError`: use `encoding=None` to get `bytes`.  So does
+          `universal_newlines=True`, as `Sub` does not translate newlines.
+
           If `kwargs['shell']` is true, `Popen` expects a string,
           and so if `cmd` is not a string, it is joined using `shlex`.
 
@@ -70,26 +134,59 @@ class Sub:
           and so if `cmd` is a string, it is split using `shlex`.
     """
 
-    @functools.wraps(subprocess.Popen)
-    def __init__(self, cmd: Cmd, *, by_lines: bool = True, **kwargs: t.Any) -> None:
+    def __init__(
+        self,
+        cmd: Cmd,
+        *,
+        by_lines: bool = True,
+        encoding: t.Optional[str] = 'utf8',
+        errors: str = 'strict',
+        merge: bool = False,
+        **kwargs: t.Any,
+    ) -> None:
         if 'stdout' in kwargs or 'stderr' in kwargs:
             raise ValueError('Cannot set stdout or stderr')
+        # The pipes are read as bytes and decoded by Sub itself, so text=True
+        # asks for what Sub does anyway
+        text = kwargs.pop('text', None)
+        if text is not None and not text:
+            raise ValueError('Use encoding=None instead of text=False')
+        if kwargs.get('universal_newlines'):
+            raise ValueError('Sub does not translate newlines')
 
         self.cmd = cmd
         self.by_lines = by_lines
+        self.encoding = encoding
+        self.errors = errors
         self.kwargs = dict(kwargs, **DEFAULTS)
-        self._threads: List[Thread] = []
+        # The pipes are read with os.read(), so a buffer would go unused
+        self.kwargs.setdefault('bufsize', 0)
+        if merge:
+            self.kwargs['stderr'] = subprocess.STDOUT
+        # Which streams are read: False is stderr and True is stdout
+        self._piped = (True,) if merge else (False, True)
+        self.proc: Optional[Union[subprocess.Popen[bytes], Process]] = None
+        self._readers: List[Event] = []
 
         shell = kwargs.get('shell', False)
         if isinstance(cmd, str):
             if not shell:
-                self.cmd = shlex.split(cmd)
+                self.cmd = list(_split(cmd))
         else:
             if shell:
-                self.cmd = shlex.join(cmd)
+                self.cmd = _join(tuple(cmd))
+
+        if _can_spawn(self.cmd, kwargs):
+            # Pipes and files Python opens are not inherited (PEP 446), so
+            # keeping them open lets CPython use posix_spawn() over fork()
+            self.kwargs.setdefault('close_fds', False)
 
     @property
-    def returncode(self) -> int:
+    def returncode(self) -> Optional[int]:
+        """
+        The returncode of the subprocess, where 0 means no error: None while
+        the subprocess is still running, and 0 if it has not been spawned
+        """
         return self.proc.returncode if self.proc else 0
 
     def __iter__(self) -> t.Iterator[t.Tuple[bool, str]]:
@@ -101,19 +198,81 @@ class Sub:
         After iteration is done, the `.returncode` property contains
         the error code from the subprocess, an integer where 0 means no error.
         """
-        queue: Queue[t.Tuple[bool, t.Optional[str]]] = Queue()
+        with self._spawn():
+            for ok, lines in self._read():
+                for line in lines:
+                    yield ok, line
+
+    async def __aiter__(self) -> t.AsyncIterator[t.Tuple[bool, str]]:
+        """
+        Like `__iter__`, but runs the subprocess under `asyncio`, so that
+        `async for ok, line in Sub(cmd)` reads both streams without threads.
+
+        On Windows, asyncio's default proactor event loop reads the pipes
+        with overlapped I/O, so this is also the thread-free path there.
+        """
+        kwargs = dict(self.kwargs)
+        # asyncio's pipes are always unbuffered, and it only accepts bufsize=0
+        kwargs.pop('bufsize')
+        if kwargs.pop('shell', False):
+            assert isinstance(self.cmd, str)
+            proc = await asyncio.create_subprocess_shell(self.cmd, **kwargs)
+        else:
+            proc = await asyncio.create_subprocess_exec(*self.cmd, **kwargs)
+
+        self.proc = proc
+        queue: asyncio.Queue[t.Tuple[bool, Read]] = asyncio.Queue()
+
+        async def read_stream(ok: bool) -> None:
+            # Ends with None, or with the exception to raise in the consumer
+            end: Read = None
+            try:
+                stream = proc.stdout if ok else proc.stderr
+                assert stream is not None
+                split = _splitter(self.by_lines, self.encoding, self.errors)
+                chunk = b'.'
+                while chunk:
+                    chunk = await stream.read(CHUNK_SIZE)
+                    lines = split(chunk)
+                    if lines:
+                        queue.put_nowait((ok, lines))
+            except Exception as e:
+                end = e
+            finally:
+                queue.put_nowait((ok, end))
 
-        with subprocess.Popen(self.cmd, **self.kwargs) as self.proc:
-            for ok in False, True:
-                self._start_thread(ok, lambda o, s: queue.put((o, s)))
+        tasks = [asyncio.ensure_future(read_stream(ok)) for ok in self._piped]
 
+        try:
             finished = 0
-            while finished < 2:
-                ok, line = queue.get()
-                if line:
-                    yield ok, line
-                else:
-                    finished += 1
+            while finished < len(tasks):
+                # Only wait when there is nothing queued
+                items = [await queue.get()]
+                while not queue.empty():
+                    items.append(queue.get_nowait())
+
+                for ok, lines in items:
+                    if lines is None:
+                        finished += 1
+                    elif isinstance(lines, Exception):
+                        raise lines
+                    else:
+                        for line in lines:
+                            yield ok, line
+
+            await asyncio.gather(*tasks)
+            await proc.wait()
+
+        finally:
+            # The loop was left early, or a reader failed: reap the process
+            if proc.returncode is None:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # Process has no close(): closing its transport closes the
+                # pipes and kills the process, like leaving `with Popen()`
+                proc._transport.close()  # type: ignore[attr-defined]
+                await proc.wait()
 
     def call(self, out: Callback = None, err: Callback = None) -> int:
         """
@@ -130,11 +289,35 @@ class Sub:
             err: if not None, `err` is called for each line from the
                 subprocess's stderr,
         """
-        callback = self._callback(out, err)
-        for ok, line in self:
-            callback(ok, line)
+        receive = self._callback(out, err)
+        with self._spawn() as proc:
+            for ok, lines in self._read():
+                receive(ok, lines)
+
+        return proc.returncode
+
+    def call_batch(self, out: Callback = None, err: Callback = None) -> int:
+        """
+        Run the subprocess, and call function `out` with lists of lines from
+        `stdout` and function `err` with lists of lines from `stderr`.
+
+        Like `Sub.call()`, but each callback receives every line from one
+        read of the pipe at once, which is much cheaper than one call per
+        line when the callback is as simple as `list.extend`.
+
+        Args:
+            out: if not None, `out` is called with each batch of lines from
+                the subprocess's stdout
 
-        return self.returncode
+            err: if not None, `err` is called with each batch of lines from
+                the subprocess's stderr
+        """
+        callbacks = _callbacks(out, err)
+        with self._spawn() as proc:
+            for ok, lines in self._read():
+                callbacks[ok](lines)
+
+        return proc.returncode
 
     def call_async(self, out: Callback = None, err: Callback = None) -> None:
         # DEPRECATED: now called "call_in_thread"
@@ -154,21 +337,43 @@ class Sub:
             err: If not None, `err` is called for each line from the
                 subprocess's stderr,
         """
-        with subprocess.Popen(self.cmd, **self.kwargs) as self.proc:
-            callback = self._callback(out, err)
-            for ok in False, True:
-                self._start_thread(ok, callback)
+        callback = self._callback(out, err)
+        self._spawn()
+        self._start_readers(callback)
 
     def run(self) -> t.Tuple[t.List[str], t.List[str], int]:
         """
         Reads lines from `stdout` and `stderr` into two lists `out` and `err`,
         then returns a tuple `(out, err, returncode)`
         """
-        out: t.List[str] = []
-        err: t.List[str] = []
+        if os.name == 'nt':
+            with self._spawn() as proc:
+                out_bytes, err_bytes = proc.communicate()
+            out = self._split_all(out_bytes)
+            err = self._split_all(err_bytes or b'')
+            return out, err, proc.returncode
+
+        out, err = [], []
+        returncode = self.call_batch(out.extend, err.extend)
+        return out, err, returncode
+
+    @classmethod
+    def gather(
+        cls, cmds: t.Iterable[Cmd], **kwargs: t.Any
+    ) -> t.List[t.Tuple[t.List[str], t.List[str], int]]:
+        """
+        Runs each command in `cmds` at the same time under `asyncio`, and
+        returns a list of `(out, err, returncode)` tuples like `Sub.run()`,
+        in the same order as `cmds`.
 
-        self.call(out.append, err.append)
-        return out, err, self.returncode
+        Must not be called from a running event loop.
+
+        Args:
+            cmds: The commands to run in subprocesses
+            kwargs: The arguments to `Sub`, used for every command
+        """
+        subs = [cls(cmd, **kwargs) for cmd in cmds]
+        return asyncio.run(_gather(subs))
 
     def log(
         self, out: str = '  ', err: str = '! ', print: t.Callable[..., None] = print
@@ -176,64 +381,350 @@ class Sub:
         """
         Read lines from `stdin` and `stderr` and prints them with prefixes
 
+        Each line is passed to `print` with its prefix and without its
+        trailing newline, so `print` must end the line, as `builtins.print`
+        does.  With `by_lines=False`, each chunk is printed the same way.
+
         Returns the shell integer error code from the subprocess, where 0 means
         no error.
 
         Args:
             out: The contents of `out` prepends strings from stdout
             err: The contents of `err` prepends strings from stderr
-            print: A function that accepts individual strings
+            print: A function that accepts individual strings and ends
+                each one with a newline
         """
-        return self.call(lambda x: print(out + x), lambda x: print(err + x))
+        if self.encoding is None:
+            raise ValueError('log() needs an encoding to print text')
+
+        if print is not builtins.print:
+            print_out = functools.partial(_print_line, print, out)
+            print_err = functools.partial(_print_line, print, err)
+            return self.call(print_out, print_err)
+
+        # The lines already end in newlines, so each batch is one write, and
+        # joining on the prefix puts it after every newline but the last
+        prefixes = err, out
+        with self._spawn() as proc:
+            for ok, lines in self._read():
+                if not self.by_lines:
+                    # print() would end each chunk with a newline
+                    lines = [i if i.endswith('\n') else i + '\n' for i in lines]
+                prefix = prefixes[ok]
+                text = prefix + prefix.join(lines)
+                if not text.endswith('\n'):
+                    text += '\n'
+                sys.stdout.write(text)
+
+        return proc.returncode
 
     def join(self, timeout: Optional[int] = None) -> None:
         """Join the stream handling threads"""
-        for t in self._threads:
-            t.join(timeout)
+        for done in self._readers:
+            done.wait(timeout)
 
     def kill(self) -> None:
         """Kill the running process, if any"""
         if self.proc:
             self.proc.kill()
 
-    def _start_thread(
-        self, ok: bool, callback: t.Callable[[bool, t.Optional[str]], None]
-    ) -> None:
-        def read_stream() -> None:
-            try:
-                stream = self.proc.stdout if ok else self.proc.stderr
+    def _spawn(self) -> 'subprocess.Popen[bytes]':
+        proc = subprocess.Popen(self.cmd, **self.kwargs)
+        self.proc = proc
+        for stream in proc.stdout, proc.stderr:
+            if stream is not None:
+                _grow_pipe(stream.fileno())
+        return proc
+
+    def _split_all(self, data: bytes) -> Lines:
+        split = _splitter(self.by_lines, self.encoding, self.errors)
+        return split(data) + split(b'')
+
+    def _start_readers(self, callback: Receiver) -> None:
+        def read() -> None:
+            for ok, lines in self._read():
+                callback(ok, lines)
+
+        self._readers.append(_READERS.submit(read))
+
+    def _read(self) -> Batches:
+        if os.name == 'nt':
+            # Windows can't select() on pipes, so each pipe gets a thread
+            return self._read_in_threads()
+        return self._select()
+
+    def _select(self) -> Batches:
+        proc = self.proc
+        assert isinstance(proc, subprocess.Popen)
+
+        with selectors.DefaultSelector() as sel:
+            for ok in self._piped:
+                stream = proc.stdout if ok else proc.stderr
                 assert stream is not None
-                line = '.'
-                while line or self.proc.poll() is None:
-                    if self.by_lines:
-                        line = stream.readline()
-                    else:
-                        line = stream.read()
-
-                    if line:
-                        if not isinstance(line, str):
-                            line = line.decode('utf8')
-                        callback(ok, line)
-            finally:
-                callback(ok, None)
-
-        th = Thread(target=read_stream, daemon=True)
-        th.start()
-        self._threads.append(th)
+                # A spurious wakeup must not block the other pipe
+                os.set_blocking(stream.fileno(), False)
+                data = ok, stream, _splitter(self.by_lines, self.encoding, self.errors)
+                sel.register(stream, selectors.EVENT_READ, data)
+
+            # Bound once: the loop below runs once per chunk of output
+            read, select, registered = os.read, sel.select, sel.get_map()
+            while registered:
+                for key, _ in select():
+                    ok, stream, split = key.data
+                    try:
+                        chunk = read(key.fd, CHUNK_SIZE)
+                    except BlockingIOError:
+                        continue
+                    lines = split(chunk)
+                    if lines:
+                        yield ok, lines
+                    if not chunk:
+                        sel.unregister(stream)
+                        stream.close()
+
+        proc.wait()
+
+    def _read_in_threads(self) -> Batches:
+        # deque.append() and popleft() are atomic, so the readers only need
+        # to wake this thread up, not to lock anything
+        items: Deque[t.Tuple[bool, Read]] = deque()
+        ready = Event()
+        append, wake = items.append, ready.set
+
+        def put(ok: bool, lines: Read) -> None:
+            append((ok, lines))
+            wake()
+
+        for ok in self._piped:
+            _READERS.submit(functools.partial(self._read_pipe, ok, put))
+
+        finished = 0
+        while finished < len(self._piped):
+            try:
+                ok, lines = items.popleft()
+            except IndexError:
+                ready.wait()
+                ready.clear()
+                continue
+
+            if lines is None:
+                finished += 1
+            elif isinstance(lines, Exception):
+                raise lines
+            else:
+                yield ok, lines
+
+        proc = self.proc
+        assert isinstance(proc, subprocess.Popen)
+        proc.wait()
+
+    def _read_pipe(self, ok: bool, put: t.Callable[[bool, Read], None]) -> None:
+        # Ends with None, or with the exception to raise on the reading thread
+        end: Read = None
+        proc = self.proc
+        assert isinstance(proc, subprocess.Popen)
+        stream = proc.stdout if ok else proc.stderr
+        assert stream is not None
+        try:
+            fd = stream.fileno()
+            split = _splitter(self.by_lines, self.encoding, self.errors)
+            chunk = b'.'
+            while chunk:
+                chunk = os.read(fd, CHUNK_SIZE)
+                lines = split(chunk)
+                if lines:
+                    put(ok, lines)
+        except Exception as e:
+            end = e
+        finally:
+            # Closing the pipe stops a child writing to it from blocking forever
+            stream.close()
+            put(ok, end)
 
     def _callback(
         self,
         out: t.Optional[t.Callable[..., t.Any]],
         err: t.Optional[t.Callable[..., t.Any]],
-    ) -> t.Callable[[bool, t.Optional[str]], t.Any]:
-        if out and err:
-            return lambda ok, line: line and (out(line) if ok else err(line))
-        if out:
-            return lambda ok, line: line and ok and out(line)
-        if err:
-            return lambda ok, line: line and not ok and err(line)
-        else:
-            return lambda ok, line: None
+    ) -> Receiver:
+        callbacks = _callbacks(out, err)
+
+        def callback(ok: bool, lines: Lines) -> None:
+            cb = callbacks[ok]
+            if cb is not _noop:
+                for line in lines:
+                    cb(line)
+
+        return callback
+
+
+class _ReaderPool:
+    """Reuse daemon threads to read from pipes, instead of starting new ones"""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.idle = 0
+        self.lock = Lock()
+        self.tasks: SimpleQueue[t.Tuple[t.Callable[[], None], Event]] = SimpleQueue()
+
+    def submit(self, target: t.Callable[[], None]) -> Event:
+        """Run `target` on a reader thread, and return an Event set when done"""
+        done = Event()
+        with self.lock:
+            if self.idle:
+                self.idle -= 1
+            else:
+                Thread(target=self._work, name='sproc-reader', daemon=True).start()
+
+        self.tasks.put((target, done))
+        return done
+
+    def _work(self) -> None:
+        while True:
+            target, done = self.tasks.get()
+            try:
+                target()
+            finally:
+                done.set()
+
+            with self.lock:
+                self.idle += 1
+
+
+_READERS = _ReaderPool()
+
+if hasattr(os, 'register_at_fork'):
+    # The reader threads don't survive into a forked child
+    os.register_at_fork(after_in_child=_READERS.reset)
+
+
+if sys.platform == 'linux' and sys.version_info >= (3, 10):
+    from fcntl import F_SETPIPE_SZ, fcntl
+
+    def _grow_pipe(fd: int) -> None:
+        # A bigger pipe means fewer reads for us and fewer stalls for a child
+        # that writes a lot, but the kernel refuses if the user has too many
+        try:
+            fcntl(fd, F_SETPIPE_SZ, PIPE_SIZE)
+        except OSError:
+            pass
+
+else:
+
+    def _grow_pipe(fd: int) -> None:
+        pass
+
+
+def _can_spawn(cmd: Cmd, kwargs: Mapping[str, t.Any]) -> bool:
+    # Whether Popen would use posix_spawn() for `cmd` if close_fds were False
+    if not SPAWN_NEEDS_OPEN_FDS or SPAWN_BLOCKERS.intersection(kwargs):
+        return False
+
+    if kwargs.get('shell'):
+        executable = kwargs.get('executable') or '/bin/sh'
+    else:
+        executable = kwargs.get('executable') or (cmd[0] if cmd else '')
+    return bool(os.path.dirname(executable))
+
+
+@functools.lru_cache(maxsize=256)
+def _split(cmd: str) -> t.Tuple[str, ...]:
+    return tuple(shlex.split(cmd))
+
+
+@functools.lru_cache(maxsize=256)
+def _join(cmd: t.Tuple[str, ...]) -> str:
+    return shlex.join(cmd)
+
+
+def _noop(line: str) -> None:
+    pass
+
+
+def _print_line(print: t.Callable[..., None], prefix: str, line: str) -> None:
+    # `print` ends the line itself, like builtins.print
+    print(prefix + (line[:-1] if line.endswith('\n') else line))
+
+
+def _callbacks(
+    out: t.Optional[t.Callable[..., t.Any]], err: t.Optional[t.Callable[..., t.Any]]
+) -> t.Tuple[t.Callable[..., t.Any], t.Callable[..., t.Any]]:
+    # Indexed by `ok`, which is False for stderr and True for stdout
+    return err or _noop, out or _noop
+
+
+def _splitter(
+    by_lines: bool, encoding: t.Optional[str], errors: str = 'strict'
+) -> t.Callable[[bytes], Lines]:
+    """
+    Return a function that turns successive chunks of bytes from a stream into
+    lines of text, or into chunks of text if `by_lines` is false.
+
+    If `encoding` is None, the lines or chunks are left as bytes; otherwise,
+    `errors` says how to handle bytes that cannot be decoded.
+
+    An empty chunk means the end of the stream, and flushes any partial line.
+    """
+    decode: t.Callable[[bytes, bool], t.Any]
+    if encoding:
+        # One decoder per stream copes with characters split between chunks
+        decode = codecs.getincrementaldecoder(encoding)(errors).decode
+    else:
+        decode = _no_decode
+
+    newline: t.Any = '\n' if encoding else b'\n'
+    empty = newline[:0]
+
+    # The pieces of an unfinished line, only joined once the line is complete,
+    # so a very long line is not copied again for every chunk
+    tail: t.List[t.Any] = []
+
+    def split(chunk: bytes) -> Lines:
+        text: t.Any = decode(chunk, not chunk)
+        if not by_lines:
+            return [text] if text else []
+
+        if not chunk:
+            rest = empty.join(tail) + text
+            tail.clear()
+            return [rest] if rest else []
+
+        # splitlines() keeps the line endings, which saves copying each line
+        lines: Lines = text.splitlines(True)
+        last = lines.pop() if lines and not lines[-1].endswith(newline) else empty
+        if len(lines) != text.count(newline):
+            # splitlines() also broke lines at other boundaries, like '\r'
+            *lines, last = text.split(newline)
+            lines = [i + newline for i in lines]
+
+        if lines and tail:
+            tail.append(lines[0])
+            lines[0] = empty.join(tail)
+            tail.clear()
+        if last:
+            tail.append(last)
+
+        return lines
+
+    return split
+
+
+def _no_decode(chunk: bytes, final: bool) -> bytes:
+    return chunk
+
+
+async def _gather(subs: t.List[Sub]) -> t.List[t.Tuple[t.List[str], t.List[str], int]]:
+    async def run_one(sub: Sub) -> t.Tuple[t.List[str], t.List[str], int]:
+        out: t.List[str] = []
+        err: t.List[str] = []
+        async for ok, line in sub:
+            (out if ok else err).append(line)
+        returncode = sub.returncode
+        assert returncode is not None
+        return out, err, returncode
+
+    return list(await asyncio.gather(*(run_one(sub) for sub in subs)))
 
 
 def call(cmd: Cmd, out: Callback = None, err: Callback = None, **kwargs: t.Any) -> int:
@@ -270,11 +761,34 @@ def call_in_thread(
     return Sub(cmd, **kwargs).call_in_thread(out, err)
 
 
+def call_batch(
+    cmd: Cmd, out: Callback = None, err: Callback = None, **kwargs: t.Any
+) -> int:
+    """
+    Args:
+      cmd:  The command to run in a subprocess
+
+      out: if not None, `out` is called with each batch of lines from the
+          subprocess's stdout
+
+      err: if not None, `err` is called with each batch of lines from the
+          subprocess's stderr
+
+      kwargs: The arguments to subprocess.Popen.
+    """
+    return Sub(cmd, **kwargs).call_batch(out, err)
+
+
 call_async = call_in_thread
 
 
-@functools.wraps(Sub.__init__)
 def run(cmd: Cmd, **kwargs: t.Any) -> t.Tuple[t.List[str], t.List[str], int]:
+    """
+    Args:
+      cmd:  The command to run in a subprocess
+
+      kwargs: The arguments to subprocess.Popen.
+    """
     return Sub(cmd, **kwargs).run()
 
 
@@ -290,6 +804,18 @@ def log(
         cmd:  The command to run in a subprocess
         out: The contents of `out` prepends strings from stdout
         err: The contents of `err` prepends strings from stderr
-        print: A function that accepts individual strings
+        print: A function that accepts individual strings and ends
+            each one with a newline
     """
     return Sub(cmd, **kwargs).log(out, err, print)
+
+
+def gather(
+    cmds: t.Iterable[Cmd], **kwargs: t.Any
+) -> t.List[t.Tuple[t.List[str], t.List[str], int]]:
+    """
+    Args:
+        cmds: The commands to run in subprocesses, all at the same time
+        kwargs: The arguments to `Sub`, used for every command
+    """
+    return Sub.gather(cmds, **kwargs)
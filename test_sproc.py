@@ -1,4 +1,14 @@
+import asyncio
+import builtins
+import contextlib
+import functools
+import io
+import os
+import subprocess
+import sys
+import time
 import unittest
+from unittest import mock
 
 import sproc
 
@@ -30,15 +40,217 @@ class RunTest(unittest.TestCase):
             assert len(lines) >= 10
 
     def test_error(self):
+        cmd = 'ls foo pyproject.toml bar'
         for shell in False, True:
             self.lines.clear()
-            error = self.sub('ls foo pyproject.toml bar', shell=shell)
+            error = self.sub(cmd, shell=shell)
 
             assert error
             assert 'pyproject.toml\n' in self.lines
 
-            for _ in 'foo', 'bar':
-                assert sum(i.endswith(_NO_SUCH) for i in self.lines) == 2
+            assert sum(i.endswith(_NO_SUCH) for i in self.lines) == 2
+
+    def test_iter(self):
+        cmd = 'ls foo pyproject.toml bar'
+        for shell in False, True:
+            sub = sproc.Sub(cmd, shell=shell)
+            lines = list(sub)
+
+            assert sub.returncode
+            assert (True, 'pyproject.toml\n') in lines
+            assert sum(not ok and i.endswith(_NO_SUCH) for ok, i in lines) == 2
+
+    def test_iter_break(self):
+        for shell in False, True:
+            sub = sproc.Sub('seq 1000000', shell=shell)
+            for ok, line in sub:
+                break
+
+            assert (ok, line) == (True, '1\n')
+            # Leaving the loop closes the pipes and waits for the subprocess
+            assert sub.returncode is not None
+
+    def test_aiter_break(self):
+        async def first(sub):
+            async for ok, line in sub:
+                break
+            # Leaving the loop closes the async generator soon after
+            await asyncio.sleep(0.2)
+            return ok, line
+
+        for shell in False, True:
+            sub = sproc.Sub('seq 10000000', shell=shell)
+            assert asyncio.run(first(sub)) == (True, '1\n')
+            assert sub.returncode is not None
+
+    def test_aiter_error(self):
+        async def read(sub):
+            return [i async for i in sub]
+
+        code = "import os; os.write(1, b'\\xff\\n' + b'x' * 3000000)"
+        sub = sproc.Sub([sys.executable, '-c', code])
+        with self.assertRaises(UnicodeDecodeError):
+            asyncio.run(read(sub))
+        assert sub.returncode is not None
+
+    def test_call_batch(self):
+        batches = []
+        cmd = 'ls foo pyproject.toml bar'
+        error = sproc.call_batch(cmd, self.lines.extend, batches.append)
+
+        assert error
+        assert self.lines == ['pyproject.toml\n']
+        assert sum(i.endswith(_NO_SUCH) for b in batches for i in b) == 2
+
+    def test_split_characters(self):
+        # A multi-byte character is sure to straddle two chunks somewhere
+        line = 'x' + 'é' * sproc.CHUNK_SIZE
+        cmd = [sys.executable, '-c', f"print('x' + 'é' * {sproc.CHUNK_SIZE})"]
+        for by_lines in True, False:
+            out, err, error_code = sproc.run(cmd, by_lines=by_lines)
+
+            assert not error_code
+            assert not err
+            assert ''.join(out) == line + '\n'
+
+    def test_carriage_return(self):
+        cmd = [sys.executable, '-c', r"import os; os.write(1, b'a\rb\r\nc\x0cd\n')"]
+        for encoding in 'utf8', None:
+            out, err, error_code = sproc.run(cmd, encoding=encoding)
+            lines = ['a\rb\r\n', 'c\x0cd\n']
+
+            assert not error_code
+            assert out == lines if encoding else [i.encode() for i in lines]
+
+    def test_errors(self):
+        cmd = [sys.executable, '-c', r"import os; os.write(1, b'ab\xff\n')"]
+        out, err, error_code = sproc.run(cmd, errors='replace')
+
+        assert not error_code
+        assert out == ['ab\ufffd\n']
+
+        with self.assertRaises(UnicodeDecodeError):
+            sproc.run(cmd)
+
+        assert sproc.run(cmd, text=True, errors='replace') == (out, err, error_code)
+        with self.assertRaises(ValueError):
+            sproc.Sub(cmd, text=False)
+        with self.assertRaises(ValueError):
+            sproc.Sub(cmd, universal_newlines=True)
+
+    def test_bytes(self):
+        cmd = 'ls foo pyproject.toml bar'
+        for shell in False, True:
+            out, err, error_code = sproc.run(cmd, shell=shell, encoding=None)
+
+            assert error_code
+            assert out == [b'pyproject.toml\n']
+            assert len(err) == 2
+            assert all(i.endswith(_NO_SUCH.encode()) for i in err)
+
+    def test_reuse(self):
+        sub = sproc.Sub('ls foo pyproject.toml bar')
+        for i in range(3):
+            out, err, error_code = sub.run()
+            assert error_code
+            assert out == ['pyproject.toml\n']
+            assert len(err) == 2
+
+    @unittest.skipUnless(sproc.SPAWN_NEEDS_OPEN_FDS, 'close_fds is left alone')
+    def test_close_fds(self):
+        def close_fds(*args, **kwargs):
+            return sproc.Sub(*args, **kwargs).kwargs.get('close_fds')
+
+        assert close_fds('/bin/ls') is False
+        assert close_fds('ls', shell=True) is False
+        assert close_fds('/bin/ls', close_fds=True) is True
+
+        # posix_spawn() isn't possible, so keep Popen's default
+        assert close_fds('ls') is None
+        assert close_fds('/bin/ls', pass_fds=(0,)) is None
+        assert close_fds('/bin/ls', cwd='/') is None
+        assert close_fds('ls', shell=True, start_new_session=True) is None
+
+    def test_gather(self):
+        cmds = 'ls foo pyproject.toml bar', 'ls sproc', 'ls'
+        results = sproc.gather(cmds)
+        assert results == [sproc.run(c) for c in cmds]
+
+    @unittest.skipUnless(getattr(subprocess, '_USE_POSIX_SPAWN', False), 'No spawn')
+    def test_posix_spawn(self):
+        with mock.patch('os.posix_spawn', wraps=os.posix_spawn) as spawn:
+            out, err, error_code = sproc.run('ls pyproject.toml', shell=True)
+
+        assert spawn.called
+        assert out == ['pyproject.toml\n']
+        assert not err
+        assert not error_code
+
+    def test_windows(self):
+        # Windows can't select() on pipes, so it reads them in threads and
+        # run() uses communicate(): both work on POSIX too
+        cmd = 'ls foo pyproject.toml bar'
+        for shell in False, True:
+            expected = sproc.run(cmd, shell=shell)
+            out, err, _ = expected
+            lines = {(True, i) for i in out} | {(False, i) for i in err}
+
+            with mock.patch.object(os, 'name', 'nt'):
+                assert sproc.run(cmd, shell=shell) == expected
+
+                sub = sproc.Sub(cmd, shell=shell)
+                assert set(sub) == lines
+                assert sub.returncode == expected[2]
+
+                self.lines.clear()
+                assert self.sub(cmd, shell=shell) == expected[2]
+                assert sorted(self.lines) == sorted(out + err)
+
+                merged, no_err, error_code = sproc.run(cmd, shell=shell, merge=True)
+                assert sorted(merged) == sorted(out + err)
+                assert not no_err
+                assert error_code == expected[2]
+
+                self.lines.clear()
+                sub = sproc.Sub(cmd, shell=shell)
+                sub.call_in_thread(self.lines.append, self.lines.append)
+                sub.join()
+                assert sorted(self.lines) == sorted(out + err)
+
+    def test_windows_decode_error(self):
+        # The error must reach the caller, and must not leave a chatty child
+        # blocked on a pipe that nobody reads
+        code = "import os; os.write(1, b'\\xff\\n' + b'x' * 3000000)"
+        cmd = [sys.executable, '-c', code]
+        with mock.patch.object(os, 'name', 'nt'):
+            with self.assertRaises(UnicodeDecodeError):
+                sproc.run(cmd)
+            with self.assertRaises(UnicodeDecodeError):
+                list(sproc.Sub(cmd))
+            with self.assertRaises(UnicodeDecodeError):
+                sproc.call(cmd)
+
+    def test_bufsize(self):
+        cmd = 'ls foo pyproject.toml bar'
+        sub = sproc.Sub(cmd, bufsize=4096)
+        assert sub.kwargs['bufsize'] == 4096
+        assert sub.run() == sproc.run(cmd)
+
+        async def read():
+            return {i async for i in sub}
+
+        assert asyncio.run(read()) == set(sproc.Sub(cmd))
+
+    def test_merge(self):
+        cmd = 'ls foo pyproject.toml bar'
+        for shell in False, True:
+            out, err, error_code = sproc.run(cmd, shell=shell, merge=True)
+
+            assert error_code
+            assert not err
+            assert len(out) == 3
+            assert 'pyproject.toml\n' in out
+            assert sum(i.endswith(_NO_SUCH) for i in out) == 2
 
     def test_log(self):
         cmd = 'ls foo pyproject.toml bar'
@@ -48,13 +260,45 @@ class RunTest(unittest.TestCase):
 
             assert error
             assert len(self.lines) == 3
-            assert '  pyproject.toml\n' in self.lines
+            assert '  pyproject.toml' in self.lines
 
             for f in 'foo', 'bar':
                 assert sum(f in i for i in self.lines) == 1
 
             assert sum(i.startswith('! ') for i in self.lines) == 2
 
+    def test_log_same_for_any_print(self):
+        # The last line has no newline
+        code = "import os; os.write(1, b'a\\n\\nb\\n'); os.write(2, b'c\\nd')"
+        cmd = [sys.executable, '-c', code]
+        printed = []
+        for print in builtins.print, functools.partial(builtins.print, flush=True):
+            with contextlib.redirect_stdout(io.StringIO()) as fp:
+                error = sproc.log(cmd, print=print)
+
+            assert not error
+            printed.append(sorted(fp.getvalue().splitlines(keepends=True)))
+
+        assert printed[0] == printed[1]
+        assert printed[0] == ['  \n', '  a\n', '  b\n', '! c\n', '! d\n']
+
+    def test_log_bytes(self):
+        for print in builtins.print, self.lines.append:
+            with self.assertRaises(ValueError):
+                sproc.log('ls', encoding=None, print=print)
+
+    def test_log_to_stdout(self):
+        cmd = 'ls foo pyproject.toml bar'
+        for shell in False, True:
+            with contextlib.redirect_stdout(io.StringIO()) as fp:
+                error = sproc.log(cmd, shell=shell)
+
+            assert error
+            lines = fp.getvalue().splitlines(keepends=True)
+            assert len(lines) == 3
+            assert '  pyproject.toml\n' in lines
+            assert sum(i.startswith('! ') for i in lines) == 2
+
     def test_run(self):
         cmd = 'ls foo pyproject.toml bar'
         for shell in False, True:
@@ -81,5 +325,30 @@ class RunTest(unittest.TestCase):
             assert len(lines) == 1
             assert len(errors) == 1
 
+    def test_call_in_thread_does_not_block(self):
+        sub = sproc.Sub('sleep 2')
+        assert sub.returncode == 0
+
+        start = time.time()
+        sub.call_in_thread()
+        assert time.time() - start < 1
+        assert sub.returncode is None
+
+        sub.kill()
+        sub.join()
+        assert sub.returncode
+
+    def test_aiter(self):
+        async def read(sub):
+            return [i async for i in sub]
+
+        for shell in False, True:
+            sub = sproc.Sub('ls pyproject.toml MISSING', shell=shell)
+            results = asyncio.run(read(sub))
+            assert sub.returncode != 0
+
+            assert (True, 'pyproject.toml\n') in results
+            assert sum(not ok for ok, _ in results) == 1
+
 
 _NO_SUCH = 'No such file or directory\n'